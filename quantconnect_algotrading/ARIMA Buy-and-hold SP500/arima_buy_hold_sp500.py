@@ -1,14 +1,15 @@
 # general imports 
 import numpy as np 
-import itertools
 from datetime import timedelta
-import statsmodels.api as sm
 
 # framewoirk imports 
 from AlgorithmImports import QCAlgorithm
 from AlgorithmImports import Resolution, DataNormalizationMode 
 from AlgorithmImports import BrokerageName, AccountType
 from AlgorithmImports import Slice
+
+# library imports
+from forecasting import ARIMAForecaster
 # endregion
 
 class ARIMABuyAndHoldSPY(QCAlgorithm):
@@ -34,6 +35,7 @@ class ARIMABuyAndHoldSPY(QCAlgorithm):
         self.entryPrice = 0 # track entry price of our SPY position
         self.period = timedelta(31) # timeframe of 31 days
         self.nextEntryTime = self.Time # tracks when we should we re-entre along / want to strat investing right away (cur time)
+        self.forecaster = ARIMAForecaster() # ARIMA(p, d, q) forecaster, order selected on the BIC
 
         # set algorithm benchmark (will generate a chart at backtesting time)
         self.SetBenchmark("SPY")
@@ -71,65 +73,22 @@ class ARIMABuyAndHoldSPY(QCAlgorithm):
         else:
             return "downtrend"
 
-    def FindBestARIMA(self, data):
-        """
-        Find the best ARIMA(p, d, q) model based on the BIC criterion.
-
-        Arguments:
-            - data (list): List of historical close prices.
-
-        Returns:
-            - best_arima_model (ARIMA): The best ARIMA(p, d, q) model.
-        """
-        best_bic = np.inf
-        best_arima_model = None
-
-        p_values = range(3)
-        d_values = range(2)
-        q_values = range(3)
-
-        # Create all possible combinations of p, d, and q values
-        all_combinations = list(itertools.product(p_values, d_values, q_values))
-
-        for p, d, q in all_combinations:
-            try:
-                arima_model = sm.tsa.ARIMA(data, order=(p, d, q)).fit()
-                bic = arima_model.bic
-                if bic < best_bic:
-                    best_bic = bic
-                    best_arima_model = arima_model
-            except:
-                continue
-
-        return best_arima_model
-
-
-
-    def PerformARIMAForecast(self, history_data):
+    def PerformARIMAForecast(self, history_data, steps=4):
         """
-        Perform ARIMA(p, d, q) forecast on the Close price for the next 4 candles using the most optimal ARIMA model.
+        Perform ARIMA(p, d, q) forecast on the Close price for the next candles (4 by default) using the most optimal ARIMA model.
 
         Arguments:
             - history_data (list): Historical data of close prices.
+            - steps (int): Number of candles to forecast.
 
         Returns:
-            - forecast (list): List containing the forecasts for the next 4 candles.
-            - confidence_80 (tuple): Tuple containing the lower and upper 80% confidence bounds for the forecasts.
+            - result (ForecastResult): Forecasts for the next candles, with prediction intervals
+                                       at any confidence level (e.g. result.Interval(0.80)).
         """
 
-        # Find the best ARIMA model based on the BIC criterion
-        arima_model = self.FindBestARIMA(history_data)
-
-        # Make a 4-step ahead forecast
-        forecast = arima_model.forecast(steps=4)
-
-        # Compute the confidence intervals for 80% confidence level
-        stderr = np.sqrt(arima_model.predict(start=arima_model.nobs-1,
-                                             end=arima_model.nobs+3,
-                                             dynamic=False).var())
-        confidence_80 = forecast - 1.28 * stderr, forecast + 1.28 * stderr  # 80% confidence bounds (1.28 for z-score of 1.28)
-
-        return forecast, confidence_80
+        # Find the best ARIMA model based on the BIC criterion, and forecast all the steps at once
+        # with the analytic forecast variance of the model (no extra predict pass needed)
+        return self.forecaster.Forecast(history_data, steps=steps)
 
     def OnData(self, data: Slice):
         """
@@ -177,7 +136,8 @@ class ARIMABuyAndHoldSPY(QCAlgorithm):
             trend = self.AssessTrend(history_data)
 
             # Perform ARIMA forecast for the next 4 candles
-            forecast, confidence_80 = self.PerformARIMAForecast(history_data)
+            result = self.PerformARIMAForecast(history_data)
+            forecast, confidence_80 = result.mean, result.Interval(0.80)
 
             # Set take profit and stop loss thresholds based on the 80% confidence bounds of the 4th day of the forecast
             if trend == "uptrend":
@@ -0,0 +1,197 @@
+"""
+Forecasting API shared by the ARIMA and LSTM algorithms. A single model call returns
+the forecasts of all the horizons together with model-based uncertainty, so strategies
+can ask for prediction intervals at any confidence level without refitting:
+
+    - ARIMA: analytic forecast standard errors from the state-space model
+    - LSTM:  Monte-Carlo dropout samples of a multi-output network, plus the residual noise
+"""
+
+# general imports
+import itertools
+import numpy as np
+import statsmodels.api as sm
+from statistics import NormalDist
+# endregion
+
+
+class ForecastResult:
+    """
+    Forecasts of all the horizons of one model call, with their uncertainty.
+
+    Arguments:
+        - mean (np.ndarray): (H,) point forecasts, one per horizon.
+        - stderr (np.ndarray): (H,) forecast standard errors (gaussian intervals).
+        - samples (np.ndarray): (S, H) forecast samples (empirical intervals), optional.
+    """
+
+    def __init__(self, mean, stderr, samples=None):
+        self.mean = np.asarray(mean, dtype=float)
+        self.stderr = np.asarray(stderr, dtype=float)
+        self.samples = samples
+
+    def __len__(self):
+        return len(self.mean)
+
+    def Interval(self, level=0.80):
+        """
+        Prediction interval of all the horizons at the given confidence level.
+
+        Arguments:
+            - level (float): confidence level, e.g. 0.80 or 0.95.
+
+        Returns:
+            - interval (tuple): (lower, upper) arrays of shape (H,).
+        """
+        if not 0 < level < 1:
+            raise ValueError(f"Confidence level must be in (0, 1), got {level}")
+
+        # empirical quantiles when we have samples, gaussian bounds otherwise
+        if self.samples is not None:
+            alpha = (1 - level) / 2
+            lower, upper = np.quantile(self.samples, [alpha, 1 - alpha], axis=0)
+            return lower, upper
+
+        z = NormalDist().inv_cdf(0.5 + level / 2)  # e.g. 1.28 for 80%, 1.96 for 95%
+        return self.mean - z * self.stderr, self.mean + z * self.stderr
+
+    def Intervals(self, levels=(0.80, 0.95)):
+        """ Prediction intervals at several confidence levels, as a dict level -> (lower, upper). """
+        return {level: self.Interval(level) for level in levels}
+
+
+class ARIMAForecaster:
+    """
+    ARIMA(p, d, q) forecaster, the order is selected on the BIC criterion.
+
+    Arguments:
+        - p_values, d_values, q_values (iterable): orders searched.
+    """
+
+    def __init__(self, p_values=range(3), d_values=range(2), q_values=range(3)):
+        self.p_values = p_values
+        self.d_values = d_values
+        self.q_values = q_values
+
+    def FindBestARIMA(self, data):
+        """
+        Find the best ARIMA(p, d, q) model based on the BIC criterion.
+
+        Arguments:
+            - data (list): List of historical close prices.
+
+        Returns:
+            - best_arima_model (ARIMAResults): The best fitted ARIMA(p, d, q) model.
+        """
+        best_bic = np.inf
+        best_arima_model = None
+
+        # Create all possible combinations of p, d, and q values
+        all_combinations = itertools.product(self.p_values, self.d_values, self.q_values)
+
+        for p, d, q in all_combinations:
+            try:
+                arima_model = sm.tsa.ARIMA(data, order=(p, d, q)).fit()
+                if arima_model.bic < best_bic:
+                    best_bic = arima_model.bic
+                    best_arima_model = arima_model
+            except Exception:
+                continue
+
+        return best_arima_model
+
+    def Forecast(self, history_data, steps=4):
+        """
+        Forecast the next `steps` candles with analytic prediction intervals.
+
+        Arguments:
+            - history_data (list): Historical data of close prices.
+            - steps (int): number of horizons to forecast.
+
+        Returns:
+            - result (ForecastResult): forecasts of horizons 1..steps with their standard errors.
+        """
+        arima_model = self.FindBestARIMA(history_data)
+
+        # one call gives the mean and the state-space forecast variance of every horizon
+        prediction = arima_model.get_forecast(steps=steps)
+
+        return ForecastResult(np.asarray(prediction.predicted_mean), np.asarray(prediction.se_mean))
+
+
+class LSTMForecaster:
+    """
+    Two-layer LSTM forecaster with one output per horizon. Dropout is kept active at
+    prediction time (Monte-Carlo dropout) for the uncertainty of the model, and gaussian
+    noise with the variance of the training residuals is added to the samples, so the
+    intervals are prediction intervals and not only confidence bands on the mean.
+
+    Arguments:
+        - n_steps (int): number of time steps used as input sequence.
+        - units (int): units of each LSTM layer.
+        - dropout (float): dropout rate, also used to sample the forecasts.
+        - epochs (int): training epochs.
+        - mc_samples (int): number of Monte-Carlo dropout samples.
+        - seed (int): seed of the residual noise, None for a random one.
+    """
+
+    def __init__(self, n_steps=30, units=30, dropout=0.2, epochs=50, mc_samples=100, seed=None):
+        self.n_steps = n_steps
+        self.units = units
+        self.dropout = dropout
+        self.epochs = epochs
+        self.mc_samples = mc_samples
+        self.seed = seed
+
+    def PrepareData(self, data, steps):
+        """ Sliding windows of `n_steps` inputs and the `steps` following values as targets. """
+        data = np.asarray(data, dtype=float)
+        X, y = [], []
+        for i in range(len(data) - self.n_steps - steps + 1):
+            X.append(data[i:i + self.n_steps])
+            y.append(data[i + self.n_steps:i + self.n_steps + steps])
+        return np.array(X).reshape(-1, self.n_steps, 1), np.array(y)
+
+    def BuildModel(self, steps):
+        # imported here so that the ARIMA algorithms do not need keras
+        from keras.models import Sequential
+        from keras.layers import LSTM, Dense, Dropout
+
+        model = Sequential()
+        model.add(LSTM(self.units, activation='relu', input_shape=(self.n_steps, 1), return_sequences=True))
+        model.add(Dropout(self.dropout))
+        model.add(LSTM(self.units, activation='relu'))
+        model.add(Dropout(self.dropout))
+        model.add(Dense(steps))  # one output per horizon
+        model.compile(optimizer='adam', loss='mse')
+        return model
+
+    def Forecast(self, history_data, steps=1):
+        """
+        Forecast the next `steps` candles with Monte-Carlo dropout prediction intervals.
+
+        Arguments:
+            - history_data (list): Historical data of close prices.
+            - steps (int): number of horizons to forecast.
+
+        Returns:
+            - result (ForecastResult): forecasts of horizons 1..steps with their samples.
+        """
+        X, y = self.PrepareData(history_data, steps)
+
+        model = self.BuildModel(steps)
+        model.fit(X, y, epochs=self.epochs, verbose=0)
+
+        # all the dropout samples in a single batched call
+        last_n_steps = np.asarray(history_data[-self.n_steps:], dtype=float).reshape(1, self.n_steps, 1)
+        batch = np.repeat(last_n_steps, self.mc_samples, axis=0)
+        samples = np.asarray(model(batch, training=True))
+
+        # observation noise: variance of the in-sample residuals of every horizon
+        resid_var = np.mean((y - np.asarray(model(X, training=False))) ** 2, axis=0)
+        mean = samples.mean(axis=0)
+        stderr = np.sqrt(samples.var(axis=0) + resid_var)
+        rng = np.random.default_rng(self.seed)
+        samples = samples + rng.normal(0.0, np.sqrt(resid_var), size=samples.shape)
+
+        return ForecastResult(mean, stderr, samples=samples)
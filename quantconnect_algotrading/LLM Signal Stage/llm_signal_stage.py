@@ -0,0 +1,361 @@
+"""
+Asynchronous GPT signal stage. Calling a language model synchronously from `OnData`
+would block the bar for seconds, so the prompts of all the symbols of a bar are
+batched and sent concurrently from a background event loop, and the algorithm
+reads back per-symbol signals (a float in [-1, 1]) tagged with the bar they belong to.
+
+    - bounded concurrency (dedicated thread pool, counts the real HTTP calls)
+    - deduplication of identical prompts, also while they are in flight
+    - per-request deadlines
+    - persistent response cache keyed by the prompt hash (JSON file)
+
+Only the standard library is used, so it runs in the QuantConnect cloud as well as
+locally against a stub HTTP server (any OpenAI-compatible completions endpoint).
+"""
+
+# general imports
+import os
+import re
+import json
+import time
+import bisect
+import asyncio
+import hashlib
+import threading
+import http.client
+import concurrent.futures
+from urllib.parse import urlsplit
+# endregion
+
+
+DEFAULT_PROMPT = ("You are a trading assistant. Given the last daily close prices of {symbol}: "
+                  "{prices}. Answer with a single word, bullish, bearish or neutral, "
+                  "for the price trend of the next 4 days.")
+
+
+def ParseSignal(text):
+    """
+    Turn the model answer into a signal in [-1, 1].
+
+    Arguments:
+        - text (str): raw completion text, e.g. "Bullish." or "0.4".
+
+    Returns:
+        - signal (float): 1 for bullish, -1 for bearish, 0 for neutral, negated (e.g. "not bullish")
+                          or unparseable answers, or the number given by the model clipped to [-1, 1]
+                          when the whole answer is a number.
+    """
+    if text is None:
+        return 0.0
+    text = text.strip().lower()
+
+    # only when the whole answer is a number (not "1. bearish")
+    number = re.fullmatch(r"([-+]?(?:\d+\.?\d*|\.\d+))[.!]?", text)
+    if number:
+        return max(-1.0, min(1.0, float(number.group(1))))
+
+    # first sentiment word, as a whole word, and whether it is negated
+    sentiment = re.search(r"\b(?:(not|no|isn't|is not)\s+)?(bullish|bearish|neutral)\b", text)
+    if sentiment is None or sentiment.group(1):
+        return 0.0
+    return {"bullish": 1.0, "bearish": -1.0, "neutral": 0.0}[sentiment.group(2)]
+
+
+class LLMSignalStage:
+    """
+    Batches one prompt per symbol per bar, sends them concurrently and exposes
+    the results as a per-symbol feature, tagged with the time of the bar.
+
+    Arguments:
+        - endpoint (str): URL of an OpenAI-compatible completions endpoint.
+        - api_key (str): bearer token, None for no Authorization header (e.g. stub servers).
+        - model (str): model name sent with every request.
+        - max_concurrency (int): maximum number of HTTP calls in flight.
+        - timeout (float): deadline of every request in seconds (connect + send + full read).
+        - cache_path (str): JSON file for the persistent response cache, None to keep it in memory.
+        - prompt_template (str): template formatted with `symbol` and `prices`.
+        - max_tokens (int): completion length.
+        - wait_timeout (float): if set (backtests), `GetSignal` waits up to this many seconds for the
+                                batches of the requested bar, so results do not depend on timing.
+                                None (live) returns whatever has arrived.
+        - flush_every (int): number of new cache entries before the cache file is rewritten.
+        - history (int): number of past signals kept per symbol.
+    """
+
+    def __init__(self, endpoint, api_key=None, model="gpt-3.5-turbo-instruct", max_concurrency=4,
+                 timeout=10.0, cache_path=None, prompt_template=DEFAULT_PROMPT, max_tokens=5,
+                 wait_timeout=None, flush_every=100, history=10):
+        self.endpoint = endpoint
+        self.api_key = api_key
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.cache_path = cache_path
+        self.prompt_template = prompt_template
+        self.max_tokens = max_tokens
+        self.wait_timeout = wait_timeout
+        self.flush_every = flush_every
+        self.history = history
+
+        self.cache = self.LoadCache()
+        self.unsaved = 0  # new cache entries since the last flush
+        self.signals = {}  # symbol -> sorted list of (as_of, signal)
+        self.pending = {}  # as_of -> concurrent.futures.Future of the batch
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+
+        # created lazily
+        self.loop = None
+        self.thread = None
+        self.executor = None
+        self.inflight = {}  # prompt hash -> asyncio.Future
+
+    ## Cache
+
+    def PromptHash(self, prompt):
+        """ Cache key of a prompt (the model is part of the key). """
+        return hashlib.sha256(f"{self.model}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def LoadCache(self):
+        if self.cache_path is None or not os.path.exists(self.cache_path):
+            return {}
+        with open(self.cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def SaveCache(self):
+        """ Rewrite the cache file (blocking, called from a worker thread or `Stop`). """
+        if self.cache_path is None:
+            return
+        with self.flush_lock:
+            with self.lock:
+                snapshot = dict(self.cache)
+                self.unsaved = 0
+            # write to a temp file first so that a crash never leaves a half written cache
+            tmp_path = self.cache_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.cache_path)
+
+    ## Requests
+
+    def BuildPrompt(self, symbol, history_data, lookback=10):
+        """
+        Build the prompt of one symbol.
+
+        Arguments:
+            - symbol (str): ticker of the security.
+            - history_data (list): historical close prices.
+            - lookback (int): number of closes included in the prompt.
+        """
+        prices = ", ".join(f"{price:.2f}" for price in history_data[-lookback:])
+        return self.prompt_template.format(symbol=symbol, prices=prices)
+
+    def Request(self, prompt):
+        """
+        Blocking HTTP call to the completions endpoint, returns the completion text.
+        The whole call (connect, send and read) must finish within `timeout` seconds,
+        a server sending its reply slowly cannot keep the worker busy past the deadline.
+        """
+        deadline = time.monotonic() + self.timeout
+
+        def remaining():
+            left = deadline - time.monotonic()
+            if left <= 0:
+                raise TimeoutError(f"Request to {self.endpoint} exceeded {self.timeout}s")
+            return left
+
+        body = json.dumps({"model": self.model, "prompt": prompt,
+                           "max_tokens": self.max_tokens, "temperature": 0}).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+
+        url = urlsplit(self.endpoint)
+        path = url.path + (f"?{url.query}" if url.query else "")
+        connection_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        connection = connection_class(url.netloc, timeout=remaining())
+        try:
+            connection.request("POST", path or "/", body=body, headers=headers)
+            sock = connection.sock  # kept, the connection drops it when the response closes
+            sock.settimeout(remaining())
+            response = connection.getresponse()
+            if response.status != 200:
+                raise http.client.HTTPException(f"HTTP {response.status} from {self.endpoint}")
+
+            # read in chunks, re-arming the socket timeout with what is left of the deadline
+            chunks = []
+            while True:
+                sock.settimeout(remaining())
+                chunk = response.read1(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        finally:
+            connection.close()
+
+        payload = json.loads(b"".join(chunks).decode("utf-8"))
+        choice = payload["choices"][0]
+        if "text" in choice:
+            return choice["text"]
+        return choice["message"]["content"]  # chat completions format
+
+    async def Complete(self, prompt):
+        """
+        Get the completion of a prompt, from the cache or the endpoint.
+        Identical prompts in flight share the same request.
+
+        Returns:
+            - text (str): completion text, None on timeout or error (never cached).
+        """
+        key = self.PromptHash(prompt)
+        with self.lock:
+            if key in self.cache:
+                return self.cache[key]
+
+        if key in self.inflight:
+            return await self.inflight[key]
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.inflight[key] = future
+        text = None
+        try:
+            # the pool has max_concurrency workers and queued prompts wait for a free one,
+            # the deadline of `Request` only starts once the call is actually running
+            text = await loop.run_in_executor(self.executor, self.Request, prompt)
+            with self.lock:
+                self.cache[key] = text
+                self.unsaved += 1
+        except Exception:
+            # timeouts, HTTP errors and malformed answers -> no signal for this bar
+            text = None
+        finally:
+            future.set_result(text)
+            del self.inflight[key]
+
+        return text
+
+    async def FetchSignals(self, prompts, as_of):
+        """
+        Send the prompts of a bar concurrently.
+
+        Arguments:
+            - prompts (dict): symbol -> prompt.
+            - as_of (datetime): time of the bar the prompts were built on.
+
+        Returns:
+            - signals (dict): symbol -> signal in [-1, 1], None for failed requests.
+        """
+        symbols = list(prompts)
+        texts = await asyncio.gather(*(self.Complete(prompts[symbol]) for symbol in symbols))
+        signals = {symbol: None if text is None else ParseSignal(text)
+                   for symbol, text in zip(symbols, texts)}
+
+        with self.lock:
+            for symbol, signal in signals.items():
+                # failed requests keep the last good signal, so `GetSignal` falls back on
+                # `max_age` / `default` instead of reading a failure as a neutral answer
+                if signal is None:
+                    continue
+                history = self.signals.setdefault(symbol, [])
+                bisect.insort(history, (as_of, signal))
+                del history[:-self.history]
+            flush = self.cache_path is not None and self.unsaved >= self.flush_every
+
+        # rewrite the cache file off the event loop, in batches of new entries
+        if flush:
+            asyncio.get_running_loop().run_in_executor(None, self.SaveCache)
+
+        return signals
+
+    ## Algorithm facing API
+
+    def Start(self):
+        """ Start the background event loop (called once, e.g. in Initialize). """
+        if self.thread is not None:
+            return
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_concurrency)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def Stop(self):
+        """ Stop the background event loop and flush the cache (e.g. in OnEndOfAlgorithm). """
+        if self.thread is None:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.loop, self.thread, self.executor = None, None, None
+        self.SaveCache()
+
+    def Submit(self, prompts, as_of):
+        """
+        Schedule the prompts of the current bar and return right away, so `OnData` is not blocked.
+
+        Arguments:
+            - prompts (dict): symbol -> prompt.
+            - as_of (datetime): time of the bar (e.g. self.Time), the signals are tagged with it.
+
+        Returns:
+            - future (concurrent.futures.Future): resolves to the signals of this batch.
+        """
+        self.Start()
+        future = asyncio.run_coroutine_threadsafe(self.FetchSignals(prompts, as_of), self.loop)
+        with self.lock:
+            self.pending[as_of] = future
+        return future
+
+    def Run(self, prompts, as_of, timeout=None):
+        """
+        Blocking version of `Submit`, waits for the batch (useful for research and tests).
+
+        Returns:
+            - signals (dict): symbol -> signal in [-1, 1], None for failed requests.
+        """
+        return self.Submit(prompts, as_of).result(timeout)
+
+    def WaitFor(self, as_of):
+        """ Wait (up to `wait_timeout` in total) for the batches submitted at or before `as_of`. """
+        deadline = time.monotonic() + self.wait_timeout
+        with self.lock:
+            batches = [(time_, future) for time_, future in self.pending.items() if time_ <= as_of]
+        for time_, future in batches:
+            try:
+                future.result(max(deadline - time.monotonic(), 0))
+            except concurrent.futures.TimeoutError:
+                continue  # still running, it may be used by a later bar
+            except Exception:
+                pass
+            with self.lock:
+                self.pending.pop(time_, None)
+
+    def GetSignal(self, symbol, as_of, max_age=None, default=0.0):
+        """
+        Latest signal of a symbol built on a bar at or before `as_of`, to be consumed by the
+        trend/forecast logic. Pass the previous bar time for a fixed one-bar lag.
+
+        Arguments:
+            - symbol (str): ticker of the security.
+            - as_of (datetime): latest bar time the signal may come from.
+            - max_age (timedelta): signals older than this (relative to `as_of`) are ignored.
+            - default (float): signal returned when there is none.
+
+        Returns:
+            - signal (float): in [-1, 1], `default` if no usable answer has arrived.
+            - signal_time (datetime): bar time the signal was built on, None for `default`.
+        """
+        if self.wait_timeout is not None:
+            self.WaitFor(as_of)
+
+        with self.lock:
+            history = self.signals.get(symbol, [])
+            usable = [entry for entry in history if entry[0] <= as_of]
+
+        if not usable:
+            return default, None
+        signal_time, signal = usable[-1]
+        if max_age is not None and as_of - signal_time > max_age:
+            return default, None
+        return signal, signal_time
@@ -1,15 +1,15 @@
 # general imports 
 import numpy as np 
 from datetime import timedelta
-import statsmodels.api as sm
-from keras.models import Sequential
-from keras.layers import LSTM, Dense
 
 # framewoirk imports 
 from AlgorithmImports import QCAlgorithm
 from AlgorithmImports import Resolution, DataNormalizationMode 
 from AlgorithmImports import BrokerageName, AccountType
 from AlgorithmImports import Slice
+
+# library imports
+from forecasting import LSTMForecaster
 # endregion
 
 class LSTMBuyAndHoldSPY(QCAlgorithm):
@@ -59,49 +59,23 @@ class LSTMBuyAndHoldSPY(QCAlgorithm):
         self.upper_target = 0  # Initialize with default value
         self.lower_target = 0  # Initialize with default value
 
-    def ForecastLSTM(self, history_data):
+        # 2-layer LSTM, intervals from Monte-Carlo dropout samples
+        self.forecaster = LSTMForecaster(n_steps=30, units=30, epochs=50)
+
+    def ForecastLSTM(self, history_data, steps=1):
         """
         Make forecasts using the Keras LSTM model.
 
         Arguments:
             history_data (list): Historical data of close prices.
+            steps (int): Number of candles to forecast.
 
         Returns:
-            forecast (float): One-step ahead forecast.
-            confidence_80 (tuple): Tuple containing the lower and upper 80% confidence bounds.
-            confidence_95 (tuple): Tuple containing the lower and upper 95% confidence bounds.
+            result (ForecastResult): Forecasts for the next candles, with prediction intervals
+                                     at any confidence level (e.g. result.Interval(0.80)).
         """
-        def prepare_data(data, n_steps):
-            X, y = [], []
-            for i in range(len(data) - n_steps):
-                X.append(data[i:i+n_steps])
-                y.append(data[i+n_steps])
-            return np.array(X), np.array(y).reshape(-1, 1)
-
-        n_steps = 30  # Number of time steps to use as input sequence
-        X, y = prepare_data(history_data, n_steps)
-
-        # Reshape data for LSTM (samples, time steps, features)
-        X = X.reshape(X.shape[0], X.shape[1], 1)
-
-        # Build and train the LSTM model
-        model = Sequential()
-        model.add(LSTM(30, activation='relu', input_shape=(n_steps, 1), return_sequences=True))  # Extra LSTM layer
-        model.add(LSTM(30, activation='relu'))  # Original LSTM layer
-        model.add(Dense(1))
-        model.compile(optimizer='adam', loss='mse')
-        model.fit(X, y, epochs=50, verbose=0)
-
-        # Make a one-step ahead forecast using the last n_steps data
-        last_n_steps = np.array(history_data[-n_steps:]).reshape(1, n_steps, 1)
-        forecast = model.predict(last_n_steps)[0][0]
-
-        # Compute the confidence intervals for 80% and 95% confidence levels
-        stderr = np.std(y[-10:])  # Use the last 10 true values as the standard error
-        conf_int_80 = forecast - 1.28 * stderr, forecast + 1.28 * stderr  # 80% confidence bounds (1.28 for z-score of 1.28)
-        conf_int_95 = forecast - 1.96 * stderr, forecast + 1.96 * stderr  # 95% confidence bounds (1.96 for z-score of 1.96)
-
-        return forecast, conf_int_80, conf_int_95
+        # Train the model once, and get all the horizons with their Monte-Carlo dropout samples
+        return self.forecaster.Forecast(history_data, steps=steps)
 
     def OnData(self, data: Slice):
         """
@@ -150,11 +124,11 @@ class LSTMBuyAndHoldSPY(QCAlgorithm):
             history_data = self.History(self.spy, 90, Resolution.Daily)['close'].tolist()
 
             # Make forecasts using LSTM model, and extract confidence bounds 
-            forecast, confidence_80, confidence_95 = self.ForecastLSTM(history_data)
+            result = self.ForecastLSTM(history_data)
 
-            # Update lower and upper targets accordingly 
-            self.lower_target = confidence_95[0]
-            self.upper_target = confidence_80[1]
+            # Update lower and upper targets accordingly (one-step ahead, both bands from the same samples)
+            self.lower_target = result.Interval(0.95)[0][0]  # 95% lower bound
+            self.upper_target = result.Interval(0.80)[1][0]  # 80% upper bound
 
             # Check if the current price is outside the ARIMA forecast bounds
             if price < self.lower_target or price > self.upper_target:
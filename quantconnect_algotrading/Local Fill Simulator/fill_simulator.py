@@ -0,0 +1,431 @@
+"""
+Local fill and cost engine that mimics how QuantConnect fills our `SetHoldings` orders
+on an InteractiveBrokers margin account. Everything is vectorized across symbols (N)
+and parameter sets (P), so the only python loop is over the bars (T).
+
+The pieces are pluggable, and named after their LEAN counterparts:
+    - FillModel:           when/where the order fills (next bar open or bar close)
+    - SlippageModel:       half-spread + volume based market impact
+    - FeeModel:            IB-style tiered (or fixed) per-share commissions
+    - ShortBorrowModel:    daily borrow cost on short positions
+    - MarginCallModel:     Reg-T style maintenance margin checks
+"""
+
+# general imports
+import numpy as np
+# endregion
+
+
+class FillModel:
+    """
+    Decides at which price an order placed at the end of bar t gets filled.
+
+    Arguments:
+        - mode (str): "next_open" fills at the open of bar t+1 (what LEAN does for daily
+                      market orders placed in OnData), "close" fills at the close of bar t.
+    """
+
+    MODES = ("next_open", "close")
+
+    def __init__(self, mode="next_open"):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown fill mode '{mode}', expected one of {self.MODES}")
+        self.mode = mode
+
+
+class SlippageModel:
+    """
+    Spread and volume based slippage. The per-share slippage is half the quoted spread
+    plus a square-root market impact term on the fraction of the bar volume we trade:
+
+        slippage = price * (spread_bps / 2e4 + impact * sqrt(|shares| / volume))
+
+    Parameters can be scalars, arrays of shape (N,) (per symbol) or (P, 1) (per parameter set).
+
+    Arguments:
+        - spread_bps (float or array): quoted spread in basis points (used if no spread data is given).
+        - impact (float or array): market impact coefficient, 0 disables the volume term.
+    """
+
+    def __init__(self, spread_bps=1.0, impact=0.1):
+        self.spread_bps = spread_bps
+        self.impact = impact
+
+    def GetSlippage(self, shares, price, volume=None, spread=None):
+        """
+        Compute the per-share slippage amount (always >= 0).
+
+        Arguments:
+            - shares (np.ndarray): (P, N) signed order quantities.
+            - price (np.ndarray): (N,) reference prices.
+            - volume (np.ndarray): (N,) bar volumes, or None to skip the impact term.
+            - spread (np.ndarray): (N,) quoted dollar spreads, or None to use spread_bps.
+
+        Returns:
+            - slippage (np.ndarray): (P, N) per-share slippage in dollars.
+        """
+        if spread is None:
+            half_spread = price * np.asarray(self.spread_bps) / 2e4
+        else:
+            half_spread = np.asarray(spread) / 2.0
+
+        slippage = np.zeros(np.shape(shares)) + half_spread
+
+        if volume is not None and np.any(self.impact):
+            volume = np.asarray(volume, dtype=float)
+            # bars with no volume only pay the spread
+            participation = np.divide(np.abs(shares), volume,
+                                      out=np.zeros(np.shape(shares)),
+                                      where=volume > 0)
+            slippage = slippage + price * np.asarray(self.impact) * np.sqrt(participation)
+
+        return np.where(shares != 0, slippage, 0.0)
+
+
+class FeeModel:
+    """
+    Per-share commission schedule with monthly volume tiers, a per-order minimum
+    and a cap as a fraction of the trade value (InteractiveBrokers style).
+
+    Use `FeeModel.InteractiveBrokersTiered()` for IBKR Pro tiered pricing, or
+    `FeeModel.InteractiveBrokersFixed()` to match LEAN's InteractiveBrokersFeeModel.
+
+    Arguments:
+        - tier_breaks (list): monthly share volumes at which the next tier starts.
+        - tier_rates (list): per-share rate of each tier (len(tier_breaks) + 1 entries).
+        - minimum (float): minimum commission per order.
+        - max_pct (float): maximum commission as a fraction of the trade value.
+        - cap_overrides_minimum (bool): True if the cap wins over the minimum (IBKR tiered pricing),
+                                        False if the minimum is charged even above the cap (LEAN).
+    """
+
+    def __init__(self, tier_breaks=(), tier_rates=(0.005,), minimum=1.0, max_pct=0.005,
+                 cap_overrides_minimum=True):
+        if len(tier_rates) != len(tier_breaks) + 1:
+            raise ValueError("tier_rates needs exactly one more entry than tier_breaks")
+        self.tier_breaks = np.asarray(tier_breaks, dtype=float)
+        self.tier_rates = np.asarray(tier_rates, dtype=float)
+        self.minimum = minimum
+        self.max_pct = max_pct
+        self.cap_overrides_minimum = cap_overrides_minimum
+
+    @classmethod
+    def InteractiveBrokersTiered(cls):
+        """ IBKR Pro tiered US equity commissions (exchange/clearing fees not included). """
+        return cls(tier_breaks=(300_000, 3_000_000, 20_000_000, 100_000_000),
+                   tier_rates=(0.0035, 0.002, 0.0015, 0.001, 0.0005),
+                   minimum=0.35, max_pct=0.01, cap_overrides_minimum=True)
+
+    @classmethod
+    def InteractiveBrokersFixed(cls):
+        """ IBKR fixed US equity commissions, same as LEAN's InteractiveBrokersFeeModel ($1 minimum wins over the 0.5% cap). """
+        return cls(tier_breaks=(), tier_rates=(0.005,), minimum=1.0, max_pct=0.005,
+                   cap_overrides_minimum=False)
+
+    def GetOrderFee(self, shares, price, monthly_volume):
+        """
+        Compute the commission of each order.
+
+        Arguments:
+            - shares (np.ndarray): (P, N) signed order quantities.
+            - price (np.ndarray): (P, N) or (N,) fill prices.
+            - monthly_volume (np.ndarray): (P,) shares traded so far this month.
+
+        Returns:
+            - fees (np.ndarray): (P, N) commission in dollars, 0 where there is no order.
+        """
+        # the tier is picked from the volume traded so far this month (per account)
+        tier = np.searchsorted(self.tier_breaks, monthly_volume, side="right")
+        rate = self.tier_rates[tier][:, None]
+
+        quantity = np.abs(shares)
+        cap = self.max_pct * quantity * np.abs(price)
+        if self.cap_overrides_minimum:
+            fees = np.minimum(np.maximum(quantity * rate, self.minimum), cap)
+        else:
+            fees = np.maximum(np.minimum(quantity * rate, cap), self.minimum)
+
+        return np.where(quantity > 0, fees, 0.0)
+
+
+class ShortBorrowModel:
+    """
+    Borrow cost charged on the market value of short positions, accrued every bar.
+
+    Arguments:
+        - annual_rate (float or array): annualized borrow rate (scalar, (N,) or (P, 1)).
+        - bars_per_year (int): number of bars in a year (252 for daily bars).
+    """
+
+    def __init__(self, annual_rate=0.0025, bars_per_year=252):
+        self.annual_rate = annual_rate
+        self.bars_per_year = bars_per_year
+
+    def GetBorrowCost(self, holdings, price):
+        """
+        Arguments:
+            - holdings (np.ndarray): (P, N) signed share holdings.
+            - price (np.ndarray): (N,) mark prices.
+
+        Returns:
+            - cost (np.ndarray): (P,) borrow cost in dollars for this bar.
+        """
+        short_value = np.maximum(-holdings, 0) * price
+        rate = np.asarray(self.annual_rate) / self.bars_per_year
+        return (short_value * rate).sum(axis=-1)
+
+
+class MarginCallModel:
+    """
+    Reg-T style margin account: positions need `initial` margin when opened and
+    `maintenance` margin afterwards. Targets above the buying power are scaled down
+    pro-rata when the orders are sized. When the equity falls under the maintenance
+    requirement, positions are cut pro-rata back to the initial requirement.
+
+    Arguments:
+        - initial (float): initial margin requirement (0.5 == 2x leverage).
+        - maintenance (float): maintenance margin requirement.
+    """
+
+    def __init__(self, initial=0.5, maintenance=0.25):
+        self.initial = initial
+        self.maintenance = maintenance
+
+    def GetBuyingPowerScale(self, target_value, held_value, equity):
+        """
+        Scale of the new targets so that the gross exposure of the book stays within
+        the initial margin requirement (equity / initial).
+
+        Arguments:
+            - target_value (np.ndarray): (P, N) signed dollar targets of the symbols with an order.
+            - held_value (np.ndarray): (P, N) signed dollar value of the positions kept as they are.
+            - equity (np.ndarray): (P,) total portfolio value.
+
+        Returns:
+            - scale (np.ndarray): (P,) in [0, 1], 1 where the targets fit.
+        """
+        room = np.maximum(equity, 0) / self.initial - np.abs(held_value).sum(axis=-1)
+        wanted = np.abs(target_value).sum(axis=-1)
+        scale = np.divide(np.maximum(room, 0), wanted, out=np.ones_like(wanted), where=wanted > 0)
+        return np.clip(scale, 0.0, 1.0)
+
+    def GetMarginCallOrders(self, holdings, price, equity):
+        """
+        Arguments:
+            - holdings (np.ndarray): (P, N) signed share holdings.
+            - price (np.ndarray): (N,) mark prices.
+            - equity (np.ndarray): (P,) total portfolio value.
+
+        Returns:
+            - orders (np.ndarray): (P, N) liquidation orders (0 where no margin call).
+            - called (np.ndarray): (P,) True where a margin call was triggered.
+        """
+        gross = (np.abs(holdings) * price).sum(axis=-1)
+        called = (gross > 0) & (equity < self.maintenance * gross)
+
+        # scale the book so that it is back within the initial margin requirement
+        scale = np.divide(np.maximum(equity, 0), self.initial * gross,
+                          out=np.ones_like(gross), where=gross > 0)
+        scale = np.where(called, np.clip(scale, 0.0, 1.0), 1.0)
+
+        orders = np.trunc(holdings * scale[:, None]) - holdings
+        return orders, called
+
+
+class FillSimulationResult:
+    """
+    Container for the simulation output. All arrays have the parameter sets as first axis.
+
+    Attributes:
+        - equity (np.ndarray): (P, T) portfolio value at each bar close.
+        - cash (np.ndarray): (P, T) cash at each bar close.
+        - holdings (np.ndarray): (P, T, N) shares held at each bar close.
+        - fees (np.ndarray): (P, T) commissions paid at each bar.
+        - slippage (np.ndarray): (P, T) slippage paid at each bar.
+        - borrow (np.ndarray): (P, T) short borrow costs paid at each bar.
+        - margin_calls (np.ndarray): (P, T) True where a margin call was triggered.
+    """
+
+    def __init__(self, equity, cash, holdings, fees, slippage, borrow, margin_calls):
+        self.equity = equity
+        self.cash = cash
+        self.holdings = holdings
+        self.fees = fees
+        self.slippage = slippage
+        self.borrow = borrow
+        self.margin_calls = margin_calls
+
+    def Returns(self):
+        """ Bar to bar returns of the portfolio, shape (P, T-1). """
+        return self.equity[:, 1:] / self.equity[:, :-1] - 1
+
+    def TotalReturn(self):
+        """ Total return over the whole simulation, shape (P,). """
+        return self.equity[:, -1] / self.equity[:, 0] - 1
+
+    def TotalCosts(self):
+        """ Commissions + slippage + borrow costs over the whole simulation, shape (P,). """
+        return self.fees.sum(axis=1) + self.slippage.sum(axis=1) + self.borrow.sum(axis=1)
+
+
+class FillSimulator:
+    """
+    Vectorized replay of target portfolio weights (what we pass to `SetHoldings`)
+    through the fill, slippage, fee, borrow and margin models.
+
+    Arguments:
+        - initial_cash (float): starting cash of every parameter set (e.g. SetCash(2000)).
+        - fill_model (FillModel): order fill timing.
+        - slippage_model (SlippageModel): slippage per share, None for no slippage.
+        - fee_model (FeeModel): commissions, None for no commissions.
+        - borrow_model (ShortBorrowModel): short borrow costs, None for no borrow costs.
+        - margin_model (MarginCallModel): margin call checks, None to disable them.
+        - cash_buffer (float): fraction of the portfolio kept aside when sizing orders
+                               (LEAN's FreePortfolioValuePercentage).
+    """
+
+    def __init__(self, initial_cash=2000, fill_model=None, slippage_model=None,
+                 fee_model=None, borrow_model=None, margin_model=None, cash_buffer=0.0025):
+        self.initial_cash = initial_cash
+        self.fill_model = fill_model if fill_model is not None else FillModel()
+        self.slippage_model = slippage_model
+        self.fee_model = fee_model
+        self.borrow_model = borrow_model
+        self.margin_model = margin_model
+        self.cash_buffer = cash_buffer
+
+    def Simulate(self, open_prices, close_prices, weights, volume=None, spread=None, dates=None):
+        """
+        Run the simulation.
+
+        Arguments:
+            - open_prices (np.ndarray): (T, N) bar open prices, NaN where there is no bar
+                                        (not listed yet, missing data): orders are skipped.
+            - close_prices (np.ndarray): (T, N) bar close prices, NaN where there is no bar:
+                                         positions are marked at the last known close.
+            - weights (np.ndarray): (P, T, N) or (T, N) target weights decided at the close of
+                                    each bar, e.g. 1 for SetHoldings(symbol, 1). NaN means no
+                                    order for that symbol on that bar (keep current holdings).
+            - volume (np.ndarray): (T, N) bar volumes, used by the slippage model.
+            - spread (np.ndarray): (T, N) quoted dollar spreads, used by the slippage model.
+            - dates (np.ndarray): (T,) bar dates, used to reset the monthly commission tiers.
+                                  If None the tiers never reset.
+
+        Returns:
+            - result (FillSimulationResult): equity curve, holdings and costs per parameter set.
+        """
+        open_prices = np.atleast_2d(np.asarray(open_prices, dtype=float))
+        close_prices = np.atleast_2d(np.asarray(close_prices, dtype=float))
+        weights = np.asarray(weights, dtype=float)
+        if weights.ndim == 2:
+            weights = weights[None]
+        P, T, N = weights.shape
+        if close_prices.shape != (T, N) or open_prices.shape != (T, N):
+            raise ValueError(f"open/close prices must have shape {(T, N)}, got {open_prices.shape} and {close_prices.shape}")
+
+        # month keys to reset the commission tiers
+        if dates is not None:
+            months = np.asarray(dates, dtype="datetime64[M]")
+        else:
+            months = np.zeros(T, dtype="datetime64[M]")
+
+        cash = np.full(P, float(self.initial_cash))
+        holdings = np.zeros((P, N))
+        mark = np.zeros(N)  # last known close of every symbol, 0 before the first bar (nothing held)
+        monthly_volume = np.zeros(P)
+        pending = None
+
+        # outputs
+        equity_out = np.zeros((P, T))
+        cash_out = np.zeros((P, T))
+        holdings_out = np.zeros((P, T, N))
+        fees_out = np.zeros((P, T))
+        slippage_out = np.zeros((P, T))
+        borrow_out = np.zeros((P, T))
+        margin_calls_out = np.zeros((P, T), dtype=bool)
+
+        def execute(orders, price, t):
+            """ Fill `orders` at `price` (+ slippage), book costs for bar t. """
+            nonlocal cash, holdings, monthly_volume
+
+            # no price -> no fill for that symbol
+            tradable = np.isfinite(price)
+            orders = np.where(tradable, orders, 0.0)
+            price = np.where(tradable, price, 0.0)
+
+            bar_volume = volume[t] if volume is not None else None
+            bar_spread = spread[t] if spread is not None else None
+
+            if self.slippage_model is not None:
+                slip = np.nan_to_num(self.slippage_model.GetSlippage(orders, price, bar_volume, bar_spread))
+            else:
+                slip = np.zeros_like(orders)
+            fill_price = price + np.sign(orders) * slip
+
+            if self.fee_model is not None:
+                fees = self.fee_model.GetOrderFee(orders, fill_price, monthly_volume).sum(axis=1)
+            else:
+                fees = np.zeros(P)
+
+            cash = cash - (orders * fill_price).sum(axis=1) - fees
+            holdings = holdings + orders
+            monthly_volume = monthly_volume + np.abs(orders).sum(axis=1)
+
+            fees_out[:, t] += fees
+            slippage_out[:, t] += (np.abs(orders) * slip).sum(axis=1)
+
+        for t in range(T):
+
+            # new month -> commission tiers start over
+            if t > 0 and months[t] != months[t - 1]:
+                monthly_volume[:] = 0
+
+            # mark positions at the last known close, missing bars keep the previous one
+            mark = np.where(np.isfinite(close_prices[t]), close_prices[t], mark)
+
+            # orders placed at the previous close fill at this open
+            if pending is not None:
+                execute(pending, open_prices[t], t)
+                pending = None
+
+            # accrue borrow costs on the shorts we held over this bar
+            if self.borrow_model is not None:
+                borrow = self.borrow_model.GetBorrowCost(holdings, mark)
+                cash = cash - borrow
+                borrow_out[:, t] = borrow
+
+            # margin call check at the close
+            if self.margin_model is not None:
+                equity = cash + (holdings * mark).sum(axis=1)
+                orders, called = self.margin_model.GetMarginCallOrders(holdings, mark, equity)
+                if called.any():
+                    execute(orders, mark, t)
+                    margin_calls_out[:, t] = called
+
+            # turn the target weights into orders (SetHoldings), sized at the close
+            target = weights[:, t, :]
+            has_order = ~np.isnan(target) & np.isfinite(close_prices[t])
+            if has_order.any():
+                equity = cash + (holdings * mark).sum(axis=1)
+                target_value = np.nan_to_num(target) * (equity * (1 - self.cash_buffer))[:, None]
+
+                # not enough buying power for the initial margin -> scale the new targets down
+                # pro-rata, instead of filling in full and waiting for a margin call
+                if self.margin_model is not None:
+                    target_value = target_value * self.margin_model.GetBuyingPowerScale(
+                        target_value, np.where(has_order, 0.0, holdings * mark), equity)[:, None]
+
+                target_shares = np.trunc(np.divide(target_value, mark, out=np.zeros((P, N)), where=mark > 0))
+                orders = np.where(has_order, target_shares - holdings, 0.0)
+
+                if self.fill_model.mode == "close":
+                    execute(orders, close_prices[t], t)
+                elif t + 1 < T:
+                    pending = orders
+
+            equity_out[:, t] = cash + (holdings * mark).sum(axis=1)
+            cash_out[:, t] = cash
+            holdings_out[:, t] = holdings
+
+        return FillSimulationResult(equity_out, cash_out, holdings_out, fees_out,
+                                    slippage_out, borrow_out, margin_calls_out)
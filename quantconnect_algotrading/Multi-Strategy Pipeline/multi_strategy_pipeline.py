@@ -0,0 +1,79 @@
+# general imports
+from datetime import timedelta
+
+# framework imports
+from AlgorithmImports import Resolution
+
+# library imports
+from forecasting import ARIMAForecaster, LSTMForecaster
+from strategy_pipeline import PipelineAlgorithm, Strategy
+from strategy_pipeline import AlwaysLongSignal, SMATrendSignal
+from strategy_pipeline import FixedTargetExit, ATRBracketExit, ForecastBandExit
+from strategy_pipeline import FixedSizer
+# endregion
+
+class MultiStrategyPipeline(PipelineAlgorithm):
+    """
+    Runs several variants of our SP500 strategies side by side on one data feed,
+    each with a fifth of the portfolio. The variants are built from the stages of
+    the Strategy Pipeline library, so the price history is pulled once and the ARIMA
+    model is fitted once per bar for both ARIMA variants.
+    """
+
+    def Initialize(self):
+
+        self.Log("Initialize()..") # useful for debugging
+
+        # backtesting parameters, IB margin account and SPY benchmark
+        self.SetupBacktest(start=(2023, 1, 1), end=(2023, 7, 1), cash=2000, benchmark="SPY")
+
+        # add securities to algorithm (daily bars, raw prices)
+        self.AddSymbols(["SPY"], Resolution.Daily)
+
+        # same ARIMA(p, d, q) grid as the ARIMA algorithms, shared by both ARIMA variants
+        forecaster = ARIMAForecaster()
+
+        # SP500 Buy-and-hold: exit at +10% / -5% of the entry price
+        self.AddStrategy(Strategy("buy-and-hold",
+                                  signal=AlwaysLongSignal(),
+                                  exit_rule=FixedTargetExit(take_profit=0.10, stop_loss=0.05),
+                                  sizer=FixedSizer(1),
+                                  allocation=0.2,
+                                  cooldown=timedelta(31)))
+
+        # Dynamic Risk-Reward Buy and Hold: enter on the 14-candle SMA uptrend, 1:2 bracket on a
+        # Wilder smoothed ATR (like LEAN's ATR indicator), exits only checked after 31 days
+        self.AddStrategy(Strategy("dynamic-risk-reward",
+                                  signal=SMATrendSignal(lookback=14, long_only=True),
+                                  exit_rule=ATRBracketExit(period=14, stop_atr=1, target_atr=2, smoothing="wilder"),
+                                  sizer=FixedSizer(1),
+                                  allocation=0.2,
+                                  min_hold=timedelta(31)))
+
+        # ARIMA Buy-and-hold: long/short with the trend when the price leaves the 80% band of the 4th day
+        self.AddStrategy(Strategy("arima-80",
+                                  signal=AlwaysLongSignal(),
+                                  exit_rule=ForecastBandExit(forecaster, window=90, steps=4, horizon=4,
+                                                             lower_level=0.80, upper_level=0.80),
+                                  sizer=FixedSizer(1),
+                                  allocation=0.2))
+
+        # same model fit, wider 95% band
+        self.AddStrategy(Strategy("arima-95",
+                                  signal=AlwaysLongSignal(),
+                                  exit_rule=ForecastBandExit(forecaster, window=90, steps=4, horizon=4,
+                                                             lower_level=0.95, upper_level=0.95),
+                                  sizer=FixedSizer(1),
+                                  allocation=0.2))
+
+        # LSTM Buy-and-Hold: go to cash when the price leaves the one-step ahead band
+        # (95% lower bound, 80% upper bound), then stay in cash for 31 days
+        self.AddStrategy(Strategy("lstm",
+                                  signal=AlwaysLongSignal(),
+                                  exit_rule=ForecastBandExit(LSTMForecaster(n_steps=30, units=30, epochs=50),
+                                                             window=90, steps=1, horizon=1,
+                                                             lower_level=0.95, upper_level=0.80,
+                                                             on_break="liquidate"),
+                                  sizer=FixedSizer(1),
+                                  allocation=0.2,
+                                  cooldown=timedelta(31)))
@@ -0,0 +1,204 @@
+"""
+Portfolio-level risk allocator for multi-asset long/short books. Instead of going
+±100% in a single asset (like LongShortARIMA and ARIMABuyAndHoldSPY do), forecast
+signals of every symbol are turned into volatility-targeted, exposure-capped weights.
+
+The exponentially weighted covariance matrix is updated incrementally every bar in
+O(N^2) (one rank-1 update), it is never recomputed from history, so it stays fast up
+to a few hundred names.
+"""
+
+# general imports
+import numpy as np
+# endregion
+
+
+class EWMACovariance:
+    """
+    Exponentially weighted mean and covariance of the returns, updated one bar at a time:
+
+        mean_t = lam * mean_{t-1} + (1 - lam) * r_t
+        cov_t  = lam * cov_{t-1}  + (1 - lam) * (r_t - mean_{t-1}) (r_t - mean_{t-1})^T
+
+    Arguments:
+        - n_assets (int): number of assets.
+        - halflife (float): half-life of the weights in bars.
+        - warmup (int): number of returns needed before the estimate is considered ready.
+    """
+
+    def __init__(self, n_assets, halflife=30, warmup=20):
+        self.lam = 0.5 ** (1.0 / halflife)
+        self.warmup = warmup
+        self.count = 0
+        self.mean = np.zeros(n_assets)
+        self.cov = np.zeros((n_assets, n_assets))
+        self.last_prices = None
+
+        # scratch buffer, avoids allocating a new N x N matrix every bar
+        self._outer = np.zeros((n_assets, n_assets))
+
+    @property
+    def IsReady(self):
+        return self.count >= self.warmup
+
+    def Update(self, prices):
+        """
+        Update the estimate with the prices of the new bar.
+
+        Arguments:
+            - prices (np.ndarray): (N,) close prices, NaN for symbols without data this bar.
+        """
+        prices = np.asarray(prices, dtype=float)
+        if self.last_prices is None:
+            self.last_prices = prices.copy()
+            return
+
+        # symbols without data on this bar (or the previous one) are skipped: their mean, rows and
+        # columns keep the earlier estimate instead of being decayed towards a 0 return. The first
+        # return after a gap is skipped too, as it spans several bars and would inflate the variance.
+        valid = np.isfinite(prices) & np.isfinite(self.last_prices) & (self.last_prices > 0)
+        returns = np.divide(prices, self.last_prices, out=np.ones_like(prices), where=valid) - 1
+        self.last_prices = prices.copy()
+        if not valid.any():
+            return
+
+        deviation = returns - self.mean
+        if valid.all():
+            # rank-1 update in place, no N x N temporaries
+            np.outer(deviation, deviation, out=self._outer)
+            self._outer *= 1 - self.lam
+            self.cov *= self.lam
+            self.cov += self._outer
+            self.mean *= self.lam
+            self.mean += (1 - self.lam) * returns
+        else:
+            index = np.flatnonzero(valid)
+            block = np.ix_(index, index)
+            self.cov[block] = self.lam * self.cov[block] + (1 - self.lam) * np.outer(deviation[index], deviation[index])
+            self.mean[index] = self.lam * self.mean[index] + (1 - self.lam) * returns[index]
+        self.count += 1
+
+
+class RiskAllocator:
+    """
+    Turns per-symbol forecast signals into target weights and issues them as one batched rebalance.
+
+    1. raw weights are the signals scaled by the inverse volatility of each asset
+    2. the book is scaled to the target annualized volatility using the full covariance
+    3. weights are capped per name, and the gross and net exposures are capped
+
+    Arguments:
+        - symbols (list): symbols (or tickers) of the book, in a fixed order.
+        - target_vol (float): annualized portfolio volatility target.
+        - max_weight (float): maximum absolute weight per name.
+        - max_gross (float): maximum gross exposure (sum of absolute weights), 2 == Reg-T margin.
+        - max_net (float): maximum absolute net exposure.
+        - halflife (float): half-life of the covariance estimate in bars.
+        - warmup (int): number of bars before the allocator starts trading.
+        - bars_per_year (int): annualization factor of the volatility (252 for daily bars).
+        - min_trade (float): weight changes smaller than this are not traded (avoids churn).
+    """
+
+    def __init__(self, symbols, target_vol=0.10, max_weight=0.10, max_gross=1.0, max_net=0.5,
+                 halflife=30, warmup=20, bars_per_year=252, min_trade=0.005):
+        self.symbols = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.target_vol = target_vol
+        self.max_weight = max_weight
+        self.max_gross = max_gross
+        self.max_net = max_net
+        self.bars_per_year = bars_per_year
+        self.min_trade = min_trade
+
+        self.covariance = EWMACovariance(len(self.symbols), halflife=halflife, warmup=warmup)
+        self.weights = np.zeros(len(self.symbols))  # last weights sent to the broker
+
+    @property
+    def IsReady(self):
+        return self.covariance.IsReady
+
+    def ToArray(self, values, fill=np.nan):
+        """ Align a dict keyed by symbol (or an array) to the order of `self.symbols`. """
+        if isinstance(values, dict):
+            array = np.full(len(self.symbols), fill, dtype=float)
+            for symbol, value in values.items():
+                if symbol in self.index:
+                    array[self.index[symbol]] = value
+            return array
+        return np.asarray(values, dtype=float)
+
+    def Update(self, prices):
+        """
+        Update the covariance with the prices of the new bar (call once per bar).
+
+        Arguments:
+            - prices (dict or np.ndarray): symbol -> close price, or (N,) array in `symbols` order.
+        """
+        self.covariance.Update(self.ToArray(prices))
+
+    def ComputeWeights(self, signals):
+        """
+        Turn forecast signals into volatility-targeted, exposure-capped weights.
+
+        Arguments:
+            - signals (dict or np.ndarray): symbol -> signal (e.g. +1 uptrend, -1 downtrend, or
+                                            an expected return), missing symbols get 0.
+
+        Returns:
+            - weights (np.ndarray): (N,) target weights in `symbols` order.
+        """
+        signals = np.nan_to_num(self.ToArray(signals, fill=0.0))
+        if not self.IsReady or not signals.any():
+            return np.zeros(len(self.symbols))
+
+        cov = self.covariance.cov
+        vol = np.sqrt(np.maximum(np.diag(cov), 0))
+
+        # inverse volatility raw weights, assets without volatility estimate are skipped
+        weights = np.divide(signals, vol, out=np.zeros_like(signals), where=vol > 0)
+
+        # scale the whole book to the volatility target
+        portfolio_vol = np.sqrt(max(weights @ cov @ weights, 0) * self.bars_per_year)
+        if portfolio_vol > 0:
+            weights *= self.target_vol / portfolio_vol
+
+        # caps only ever reduce the risk, so they are applied after the vol scaling
+        weights = np.clip(weights, -self.max_weight, self.max_weight)
+
+        gross = np.abs(weights).sum()
+        if gross > self.max_gross:
+            weights *= self.max_gross / gross
+
+        net = weights.sum()
+        if abs(net) > self.max_net:
+            # shrink the side in excess so that the net exposure is back at the cap
+            side = weights > 0 if net > 0 else weights < 0
+            excess_side = weights[side].sum()
+            weights[side] *= (excess_side - (net - np.sign(net) * self.max_net)) / excess_side
+
+        return weights
+
+    def Rebalance(self, algorithm, signals):
+        """
+        Compute the target weights and send them to the algorithm as one batched `SetHoldings`.
+
+        Arguments:
+            - algorithm (QCAlgorithm): the running algorithm.
+            - signals (dict or np.ndarray): symbol -> forecast signal.
+
+        Returns:
+            - weights (np.ndarray): (N,) target weights in `symbols` order.
+        """
+        from AlgorithmImports import PortfolioTarget
+
+        weights = self.ComputeWeights(signals)
+
+        # only send the names whose weight moved enough, in a single call
+        changed = np.abs(weights - self.weights) >= self.min_trade
+        changed |= (weights == 0) & (self.weights != 0)
+        targets = [PortfolioTarget(self.symbols[i], float(weights[i])) for i in np.flatnonzero(changed)]
+        if targets:
+            algorithm.SetHoldings(targets)
+            self.weights[changed] = weights[changed]
+
+        return weights
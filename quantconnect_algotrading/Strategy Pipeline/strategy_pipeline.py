@@ -0,0 +1,472 @@
+"""
+Composable strategy pipeline on top of QCAlgorithm. Every strategy is made of reusable stages:
+
+    signal -> exit rule -> sizer -> executor
+
+Stages declare the data they need (window length), and the framework keeps one rolling
+window of bars per symbol (a single History pull, then updated bar by bar). Shared inputs
+(SMA, ATR, model forecasts) are computed once per bar and symbol, and reused by all the
+stages and strategies, so several strategy variants can run on one data feed in a single
+algorithm without duplicated history pulls or model fits.
+"""
+
+# general imports
+import numpy as np
+from collections import deque
+from datetime import timedelta
+
+# framework imports
+from AlgorithmImports import QCAlgorithm
+from AlgorithmImports import Resolution, DataNormalizationMode
+from AlgorithmImports import BrokerageName, AccountType
+from AlgorithmImports import PortfolioTarget
+from AlgorithmImports import Slice
+# endregion
+
+
+class BarContext:
+    """
+    Data of one symbol at the current bar, handed to every stage.
+    Computed inputs are memoized in a cache shared by all the strategies for this bar.
+
+    Arguments:
+        - symbol (Symbol): the security.
+        - time (datetime): time of the bar.
+        - window (dict): rolling windows of "open", "high", "low" and "close" prices.
+        - cache (dict): per bar cache shared across stages and strategies.
+    """
+
+    def __init__(self, symbol, time, window, cache):
+        self.symbol = symbol
+        self.time = time
+        self.window = window
+        self.cache = cache
+
+    @property
+    def price(self):
+        return self.window["close"][-1]
+
+    def Get(self, key, compute):
+        """ Return the cached value of `key`, computing it with `compute()` the first time in this bar. """
+        key = (self.symbol, key)
+        if key not in self.cache:
+            self.cache[key] = compute()
+        return self.cache[key]
+
+    def Closes(self, n):
+        """ Last n close prices, as a list. """
+        return list(self.window["close"])[-n:]
+
+    def SMA(self, n):
+        """ Simple moving average of the last n closes. """
+        return self.Get(("sma", n), lambda: np.mean(self.Closes(n)))
+
+    def ATR(self, n, smoothing="simple", length=None):
+        """
+        Average true range of period n.
+
+        Arguments:
+            - n (int): period of the ATR.
+            - smoothing (str): "simple" for the average of the last n true ranges, "wilder" for
+                               Wilder's smoothing (LEAN's ATR indicator default) over the last
+                               `length` true ranges, seeded with the average of the first n of them.
+            - length (int): number of true ranges used by the Wilder smoothing (4n by default).
+        """
+        length = n if smoothing == "simple" else (length or 4 * n)
+
+        def compute():
+            high = np.array(self.window["high"])[-length:]
+            low = np.array(self.window["low"])[-length:]
+            previous_close = np.array(self.window["close"])[-length - 1:-1]
+            true_range = np.maximum(high - low, np.maximum(np.abs(high - previous_close),
+                                                           np.abs(low - previous_close)))
+            if smoothing == "simple":
+                return true_range.mean()
+            atr = true_range[:n].mean()
+            for value in true_range[n:]:
+                atr = ((n - 1) * atr + value) / n
+            return atr
+        return self.Get(("atr", n, smoothing, length), compute)
+
+    def Trend(self, lookback=21):
+        """ "uptrend" if the current price is above the SMA of the last `lookback` closes, "downtrend" otherwise. """
+        return "uptrend" if self.price > self.SMA(lookback) else "downtrend"
+
+    def Forecast(self, forecaster, window, steps):
+        """
+        Forecast of the next `steps` candles from the last `window` closes.
+        Forecasters with the same configuration share the same fit.
+
+        Arguments:
+            - forecaster: object with a `Forecast(history_data, steps)` method (see the Forecasting library).
+            - window (int): number of closes the model is fitted on.
+            - steps (int): number of candles to forecast.
+        """
+        # repr() so that unhashable settings (e.g. p_values=[0, 1, 2]) can be part of the key
+        config = (type(forecaster).__name__,
+                  tuple((name, repr(value)) for name, value in sorted(vars(forecaster).items())))
+        return self.Get(("forecast", config, window, steps),
+                        lambda: forecaster.Forecast(self.Closes(window), steps=steps))
+
+
+class Stage:
+    """ Base class of the pipeline stages. `window` is the number of bars the stage needs. """
+
+    window = 0
+
+
+## Signals: direction to enter with, +1 long, -1 short, 0 stay in cash
+
+class AlwaysLongSignal(Stage):
+    """ Enter long whenever we are allowed to (buy-and-hold entry). """
+
+    def GetDirection(self, context):
+        return 1
+
+
+class SMATrendSignal(Stage):
+    """
+    Enter in the direction of the trend (price above/below the SMA).
+
+    Arguments:
+        - lookback (int): number of candles of the SMA.
+        - long_only (bool): stay in cash in downtrends instead of going short.
+    """
+
+    def __init__(self, lookback=21, long_only=False):
+        self.lookback = lookback
+        self.long_only = long_only
+        self.window = lookback
+
+    def GetDirection(self, context):
+        if context.Trend(self.lookback) == "uptrend":
+            return 1
+        return 0 if self.long_only else -1
+
+
+## Exit rules: None to hold, 0 to go to cash, +1/-1 to (re)enter long/short
+
+class FixedTargetExit(Stage):
+    """
+    Go to cash when the price moved by a fixed fraction from the entry price.
+
+    Arguments:
+        - take_profit (float): e.g. 0.10 to exit 10% above the entry price.
+        - stop_loss (float): e.g. 0.05 to exit 5% below the entry price.
+    """
+
+    def __init__(self, take_profit=0.10, stop_loss=0.05):
+        self.take_profit = take_profit
+        self.stop_loss = stop_loss
+
+    def GetExit(self, context, position):
+        move = position.direction * (context.price / position.entry_price - 1)
+        if move > self.take_profit or move < -self.stop_loss:
+            return 0
+        return None
+
+
+class ATRBracketExit(Stage):
+    """
+    Go to cash when the price hits a stop loss or take profit set in ATRs from the entry price.
+
+    Arguments:
+        - period (int): number of candles of the ATR.
+        - stop_atr (float): stop loss distance in ATRs.
+        - target_atr (float): take profit distance in ATRs (2x the stop for a 1:2 risk-reward).
+        - smoothing (str): "simple" or "wilder" (like LEAN's ATR indicator), see `BarContext.ATR`.
+        - window (int): bars used by the Wilder smoothing, longer windows get closer to LEAN's
+                        indicator (which is smoothed since the start of the algorithm).
+    """
+
+    def __init__(self, period=14, stop_atr=1, target_atr=2, smoothing="simple", window=None):
+        if smoothing not in ("simple", "wilder"):
+            raise ValueError(f"Unknown smoothing '{smoothing}', expected 'simple' or 'wilder'")
+        self.period = period
+        self.stop_atr = stop_atr
+        self.target_atr = target_atr
+        self.smoothing = smoothing
+        if window is None:
+            window = period + 1 if smoothing == "simple" else 4 * period + 1
+        self.window = window
+
+    def GetExit(self, context, position):
+        atr = context.ATR(self.period, self.smoothing, length=self.window - 1)
+        move = position.direction * (context.price - position.entry_price)
+        if move <= -self.stop_atr * atr or move >= self.target_atr * atr:
+            return 0
+        return None
+
+
+class ForecastBandExit(Stage):
+    """
+    Act when the price leaves the prediction interval of a model forecast.
+
+    Arguments:
+        - forecaster: forecaster of the Forecasting library (e.g. ARIMAForecaster()).
+        - window (int): number of closes the model is fitted on.
+        - steps (int): number of candles forecasted.
+        - horizon (int): horizon of the band, 1..steps (e.g. 4 for the 4th day).
+        - lower_level (float): confidence level of the lower bound.
+        - upper_level (float): confidence level of the upper bound.
+        - on_break (str): "trend" to go long/short with the SMA trend (ARIMA algorithms),
+                          "liquidate" to go to cash (LSTM algorithm).
+        - trend_lookback (int): number of candles of the SMA trend.
+    """
+
+    def __init__(self, forecaster, window=90, steps=4, horizon=4, lower_level=0.80, upper_level=0.80,
+                 on_break="trend", trend_lookback=21):
+        if on_break not in ("trend", "liquidate"):
+            raise ValueError(f"Unknown on_break '{on_break}', expected 'trend' or 'liquidate'")
+        self.forecaster = forecaster
+        self.fit_window = window
+        self.steps = steps
+        self.horizon = horizon
+        self.lower_level = lower_level
+        self.upper_level = upper_level
+        self.on_break = on_break
+        self.trend_lookback = trend_lookback
+        self.window = max(window, trend_lookback)  # the SMA trend needs its own lookback
+
+    def GetExit(self, context, position):
+        result = context.Forecast(self.forecaster, self.fit_window, self.steps)
+        lower = result.Interval(self.lower_level)[0][self.horizon - 1]
+        upper = result.Interval(self.upper_level)[1][self.horizon - 1]
+
+        if lower <= context.price <= upper:
+            return None
+        if self.on_break == "liquidate":
+            return 0
+        return 1 if context.Trend(self.trend_lookback) == "uptrend" else -1
+
+
+## Sizers: direction -> portfolio weight
+
+class FixedSizer(Stage):
+    """
+    Allocate a fixed fraction of the strategy capital, e.g. 1 for SetHoldings(symbol, ±1).
+
+    Arguments:
+        - weight (float): absolute weight of every position.
+    """
+
+    def __init__(self, weight=1.0):
+        self.weight = weight
+
+    def GetWeight(self, context, direction):
+        return direction * self.weight
+
+
+## Executor: turns the weights of all the strategies into orders
+
+class SetHoldingsExecutor:
+    """
+    Combines the target weights of all the strategies (scaled by their allocation)
+    and sends the changed ones as one batched `SetHoldings` call.
+    """
+
+    def __init__(self):
+        self.weights = {}  # (symbol, strategy name) -> weight
+        self.targets = {}  # symbol -> combined weight sent to the broker
+
+    def Execute(self, algorithm, targets):
+        """
+        Arguments:
+            - algorithm (QCAlgorithm): the running algorithm.
+            - targets (dict): symbol -> {strategy: weight} for the strategies that changed this bar.
+        """
+        for symbol, strategy_weights in targets.items():
+            for strategy, weight in strategy_weights.items():
+                self.weights[(symbol, strategy.name)] = strategy.allocation * weight
+
+        portfolio_targets = []
+        for symbol in targets:
+            combined = sum(weight for (s, _), weight in self.weights.items() if s == symbol)
+            if combined != self.targets.get(symbol, 0):
+                self.targets[symbol] = combined
+                portfolio_targets.append(PortfolioTarget(symbol, combined))
+
+        if portfolio_targets:
+            algorithm.SetHoldings(portfolio_targets)
+            for target in portfolio_targets:
+                algorithm.Log(f"TARGET {target.Symbol} @ {target.Quantity:.2f}")
+
+
+class PositionState:
+    """ Virtual position of one strategy in one symbol (several strategies share the real portfolio). """
+
+    def __init__(self, time):
+        self.direction = 0  # +1 long, -1 short, 0 cash
+        self.entry_price = 0
+        self.entry_time = time
+        self.next_entry_time = time
+
+
+class Strategy:
+    """
+    One strategy variant: signal -> exit rule -> sizer. Runs the invested/uninvested
+    state machine shared by all our algorithms, on its own virtual positions.
+
+    Arguments:
+        - name (str): unique name of the strategy (used in logs).
+        - signal (Stage): entry signal, with a `GetDirection(context)` method.
+        - exit_rule (Stage): exit rule, with a `GetExit(context, position)` method.
+        - sizer (Stage): sizer, with a `GetWeight(context, direction)` method.
+        - allocation (float): fraction of the portfolio given to this strategy.
+        - cooldown (timedelta): time to stay in cash after going to cash (31 days by default).
+        - min_hold (timedelta): exit rules are only checked once a position is at least this old.
+    """
+
+    def __init__(self, name, signal, exit_rule, sizer=None, allocation=1.0, cooldown=timedelta(31),
+                 min_hold=timedelta(0)):
+        self.name = name
+        self.signal = signal
+        self.exit_rule = exit_rule
+        self.sizer = sizer if sizer is not None else FixedSizer()
+        self.allocation = allocation
+        self.cooldown = cooldown
+        self.min_hold = min_hold
+        self.positions = {}  # symbol -> PositionState
+
+    @property
+    def window(self):
+        """ Number of bars needed by the stages of the strategy. """
+        return max(self.signal.window, self.exit_rule.window, self.sizer.window, 1)
+
+    def OnBar(self, context):
+        """
+        Run the strategy on the current bar of one symbol.
+
+        Returns:
+            - weight (float): new target weight of the symbol, None if unchanged.
+        """
+        position = self.positions.setdefault(context.symbol, PositionState(context.time))
+
+        # not invested: check if it's time to (re)enter
+        if position.direction == 0:
+            if position.next_entry_time > context.time:
+                return None
+            direction = self.signal.GetDirection(context)
+            if direction == 0:
+                return None
+
+        # invested: check the exit rule, once the minimum holding period is over
+        else:
+            if context.time < position.entry_time + self.min_hold:
+                return None
+            direction = self.exit_rule.GetExit(context, position)
+            if direction is None or direction == position.direction:
+                return None
+            if direction == 0:
+                # stay in cash for the cooldown period
+                position.direction = 0
+                position.next_entry_time = context.time + self.cooldown
+                return 0
+
+        position.direction = direction
+        position.entry_price = context.price
+        position.entry_time = context.time
+        return self.sizer.GetWeight(context, direction)
+
+
+class PipelineAlgorithm(QCAlgorithm):
+    """
+    Base algorithm running a list of strategies on one data feed. Subclasses call
+    `SetupBacktest`, `AddSymbols` and `AddStrategy` in their `Initialize`.
+    """
+
+    def SetupBacktest(self, start, end, cash=2000, benchmark="SPY"):
+        """
+        Backtest settings shared by all our algorithms.
+
+        Arguments:
+            - start (tuple): start date, e.g. (2023, 1, 1).
+            - end (tuple): end date, e.g. (2023, 7, 1).
+            - cash (float): simulation money.
+            - benchmark (str): ticker of the benchmark.
+        """
+        self.SetStartDate(*start)
+        self.SetEndDate(*end)
+        self.SetCash(cash)
+
+        # set algorithm benchmark (will generate a chart at backtesting time)
+        self.SetBenchmark(benchmark)
+
+        # InteractiveBrokers margin account (allows leverage and shorts)
+        self.SetBrokerageModel(BrokerageName.InteractiveBrokersBrokerage, AccountType.Margin)
+
+        self.symbols = []
+        self.strategies = []
+        self.windows = {}  # symbol -> rolling windows of prices
+        self.executor = SetHoldingsExecutor()
+
+    def AddSymbols(self, tickers, resolution=Resolution.Daily):
+        """ Add equities with raw prices (no mods to asset price, dividends paid in cash). """
+        self.resolution = resolution
+        for ticker in tickers:
+            equity = self.AddEquity(ticker, resolution)
+            equity.SetDataNormalizationMode(DataNormalizationMode.Raw)
+            self.symbols.append(equity.Symbol)
+        return self.symbols
+
+    def AddStrategy(self, strategy):
+        if any(s.name == strategy.name for s in self.strategies):
+            raise ValueError(f"A strategy named '{strategy.name}' already exists")
+        self.strategies.append(strategy)
+
+    def UpdateWindow(self, symbol, bar):
+        """
+        Keep one rolling window of bars per symbol, long enough for all the stages.
+        History is only pulled once per symbol, then the window is updated bar by bar.
+        """
+        if symbol not in self.windows:
+            length = max(strategy.window for strategy in self.strategies) + 1
+            window = {column: deque(maxlen=length) for column in ("open", "high", "low", "close")}
+            history = self.History(symbol, length, self.resolution)
+            if not history.empty:
+                for column in window:
+                    window[column].extend(history[column].tolist())
+            self.windows[symbol] = window
+
+            # the history already contains the current bar
+            if not history.empty and history.index.get_level_values(-1)[-1] >= bar.EndTime:
+                return
+
+        window = self.windows[symbol]
+        window["open"].append(bar.Open)
+        window["high"].append(bar.High)
+        window["low"].append(bar.Low)
+        window["close"].append(bar.Close)
+
+    def OnData(self, data: Slice):
+        """
+        Update the shared data once, run every strategy on every symbol, then execute
+        the combined targets in one batch.
+
+        Arguments:
+            - data (Slice): Slice object keyed by symbol containing the stock data
+        """
+        cache = {}  # shared inputs of this bar
+        targets = {}
+
+        for symbol in self.symbols:
+            # check if requested data does already exist
+            if symbol not in data.Bars:
+                continue
+
+            self.UpdateWindow(symbol, data.Bars[symbol])
+            window = self.windows[symbol]
+            context = BarContext(symbol, self.Time, window, cache)
+
+            for strategy in self.strategies:
+                if len(window["close"]) < strategy.window:
+                    continue
+                weight = strategy.OnBar(context)
+                if weight is not None:
+                    targets.setdefault(symbol, {})[strategy] = weight
+                    self.Log(f"{strategy.name}: {symbol} -> {weight} @ {context.price}")
+
+        self.executor.Execute(self, targets)
+
+        # Log portfolio value
+        self.Log(f"Current Portfolio value: {self.Portfolio.TotalPortfolioValue}")
@@ -0,0 +1,14 @@
+"""
+The QuantConnect libraries live in folders with spaces in their names (one folder per
+project), so they are put on the path here and imported by module name, as in the cloud.
+"""
+
+# general imports
+import os
+import sys
+# endregion
+
+ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "quantconnect_algotrading")
+
+for library in ["Forecasting", "LLM Signal Stage", "Local Fill Simulator", "Risk Allocator", "Strategy Pipeline"]:
+    sys.path.insert(0, os.path.join(ROOT, library))
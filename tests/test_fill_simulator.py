@@ -0,0 +1,110 @@
+"""
+Tests of the Local Fill Simulator.
+"""
+
+# general imports
+import numpy as np
+import pytest
+
+# library imports
+from fill_simulator import FillSimulator, FillModel, SlippageModel, FeeModel, MarginCallModel
+# endregion
+
+
+def test_fee_presets():
+    shares = np.array([[1.0]])
+    price = np.array([10.0])
+    no_volume = np.zeros(1)
+
+    # $1 minimum wins over the 0.5% cap (LEAN)
+    assert FeeModel.InteractiveBrokersFixed().GetOrderFee(shares, price, no_volume)[0, 0] == pytest.approx(1.00)
+    # $0.35 minimum capped at 1% of the trade value
+    assert FeeModel.InteractiveBrokersTiered().GetOrderFee(shares, price, no_volume)[0, 0] == pytest.approx(0.10)
+
+
+def test_fill_timing():
+    open_prices = np.array([[10.0], [20.0], [30.0]])
+    close_prices = np.array([[11.0], [21.0], [31.0]])
+    weights = np.array([[1.0], [np.nan], [np.nan]])
+
+    # order sized at the first close, filled at the next open
+    result = FillSimulator(1100, cash_buffer=0).Simulate(open_prices, close_prices, weights)
+    assert result.holdings[0, :, 0].tolist() == [0, 100, 100]
+    assert result.cash[0, 1] == pytest.approx(1100 - 100 * 20)
+
+    # filled at the same close
+    result = FillSimulator(1100, fill_model=FillModel("close"), cash_buffer=0).Simulate(
+        open_prices, close_prices, weights)
+    assert result.holdings[0, :, 0].tolist() == [100, 100, 100]
+    assert result.cash[0, 0] == pytest.approx(0)
+
+
+def test_nan_prices():
+    # symbol 1 has no bar on the second day
+    open_prices = np.array([[10.0, 10.0], [10.0, np.nan], [10.0, 10.0], [10.0, 10.0]])
+    close_prices = np.array([[10.0, 10.0], [10.0, np.nan], [10.0, 12.0], [10.0, 12.0]])
+    weights = np.array([[0.5, np.nan], [np.nan, 0.5], [np.nan, 0.5], [np.nan, np.nan]])
+
+    result = FillSimulator(1000, fill_model=FillModel("close"), cash_buffer=0).Simulate(
+        open_prices, close_prices, weights)
+
+    assert np.isfinite(result.equity).all()
+    # no close for symbol 1 on day 1 -> no order, it is placed on day 2 at 12
+    assert result.holdings[0, :, 1].tolist() == [0, 0, 41, 41]
+    # open positions are marked at the last known close
+    assert result.equity[0, 1] == pytest.approx(1000)
+
+
+def test_orders_skipped_without_open():
+    open_prices = np.array([[10.0], [np.nan], [10.0]])
+    close_prices = np.array([[10.0], [10.0], [10.0]])
+    weights = np.array([[1.0], [np.nan], [np.nan]])
+
+    result = FillSimulator(1000, cash_buffer=0).Simulate(open_prices, close_prices, weights)
+    assert result.holdings[0, :, 0].tolist() == [0, 0, 0]
+    assert np.isfinite(result.equity).all()
+
+
+def test_margin_call_after_drawdown():
+    close_prices = np.array([[100.0], [100.0], [60.0]])
+    weights = np.array([[2.0], [np.nan], [np.nan]])
+
+    result = FillSimulator(1000, fill_model=FillModel("close"), margin_model=MarginCallModel(),
+                           cash_buffer=0).Simulate(close_prices, close_prices, weights)
+
+    # 2x long, then a 40% drop: equity 200 < 25% of 1200 -> cut back to 50% initial margin
+    assert result.holdings[0, :2, 0].tolist() == [20, 20]
+    assert result.margin_calls[0].tolist() == [False, False, True]
+    assert result.holdings[0, 2, 0] == 6
+    assert result.equity[0, 2] == pytest.approx(200)
+
+
+def test_orders_sized_within_buying_power():
+    close_prices = np.array([[20.0, 20.0], [20.0, 20.0]])
+    weights = np.array([[5.0, -5.0], [np.nan, np.nan]])
+
+    result = FillSimulator(2000, fill_model=FillModel("close"), margin_model=MarginCallModel(),
+                           cash_buffer=0).Simulate(close_prices, close_prices, weights)
+
+    # 10x gross requested, scaled pro-rata to 2x (equity / initial margin)
+    assert result.holdings[0, 0].tolist() == [100, -100]
+    assert not result.margin_calls.any()
+
+    # without a margin model the order fills in full
+    result = FillSimulator(2000, fill_model=FillModel("close"), cash_buffer=0).Simulate(
+        close_prices, close_prices, weights)
+    assert result.holdings[0, 0].tolist() == [500, -500]
+
+
+def test_per_parameter_slippage():
+    close_prices = np.full((2, 1), 100.0)
+    weights = np.array([[1.0], [np.nan]])
+    slippage = SlippageModel(spread_bps=np.array([[0.0], [10.0], [20.0]]), impact=0.0)
+
+    # the same weights for the three (P, 1) slippage parameter sets
+    result = FillSimulator(10_000, fill_model=FillModel("close"), slippage_model=slippage,
+                           cash_buffer=0).Simulate(close_prices, close_prices, np.repeat(weights[None], 3, axis=0))
+
+    # 100 shares, half spread of 0, 5 and 10 bps of $100
+    assert result.slippage[:, 0] == pytest.approx([0.0, 5.0, 10.0])
+    assert result.equity[:, -1] == pytest.approx([10_000, 9_995, 9_990])
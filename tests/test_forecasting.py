@@ -0,0 +1,58 @@
+"""
+Tests of the Forecasting library.
+"""
+
+# general imports
+import numpy as np
+import pytest
+
+# library imports
+from forecasting import ForecastResult, ARIMAForecaster, LSTMForecaster
+# endregion
+
+
+class StubModel:
+    """ Stands in for the keras network: predicts the last input, with no dropout noise. """
+
+    def fit(self, X, y, epochs, verbose):
+        pass
+
+    def __call__(self, X, training=False):
+        return np.repeat(X[:, -1, :], self.steps, axis=1)
+
+
+def test_gaussian_interval():
+    result = ForecastResult([100.0], [10.0])
+    lower, upper = result.Interval(0.95)
+    assert lower[0] == pytest.approx(100 - 19.6, abs=0.01)
+    assert upper[0] == pytest.approx(100 + 19.6, abs=0.01)
+    assert set(result.Intervals()) == {0.80, 0.95}
+
+
+def test_arima_intervals_widen_with_level_and_horizon():
+    rng = np.random.default_rng(0)
+    closes = 100 + np.cumsum(rng.normal(0, 1, 90))
+    result = ARIMAForecaster(p_values=[0, 1], d_values=[1], q_values=[0]).Forecast(closes, steps=4)
+
+    lower_80, upper_80 = result.Interval(0.80)
+    lower_95, upper_95 = result.Interval(0.95)
+    assert len(result) == 4
+    assert (lower_95 < lower_80).all() and (upper_80 < upper_95).all()
+    assert np.all(np.diff(upper_95 - lower_95) > 0)
+
+
+def test_lstm_interval_includes_residual_noise(monkeypatch):
+    rng = np.random.default_rng(0)
+    closes = 100 + np.cumsum(rng.normal(0, 1, 500))
+    forecaster = LSTMForecaster(n_steps=10, mc_samples=2000, seed=0)
+
+    model = StubModel()
+    model.steps = 2
+    monkeypatch.setattr(forecaster, "BuildModel", lambda steps: model)
+    result = forecaster.Forecast(closes, steps=2)
+
+    # no dropout spread: the width only comes from the random walk residuals (std 1 and sqrt(2))
+    assert result.mean == pytest.approx([closes[-1]] * 2)
+    assert result.stderr == pytest.approx([1.0, np.sqrt(2)], rel=0.15)
+    lower, upper = result.Interval(0.95)
+    assert upper - lower == pytest.approx(2 * 1.96 * result.stderr, rel=0.1)
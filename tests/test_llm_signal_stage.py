@@ -0,0 +1,174 @@
+"""
+Tests of the LLM Signal Stage against a local stub completions server (no network).
+"""
+
+# general imports
+import json
+import time
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# library imports
+from llm_signal_stage import LLMSignalStage, ParseSignal
+# endregion
+
+
+class StubServer:
+    """
+    Threaded stub of an OpenAI-compatible completions endpoint. Answers with `answers[prompt]`
+    ("bullish" by default) after `delay` seconds, and records the calls and peak concurrency.
+    """
+
+    def __init__(self, delay=0.0, answers=None):
+        self.delay = delay
+        self.answers = answers or {}
+        self.calls = []
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub.lock:
+                    stub.calls.append(body["prompt"])
+                    stub.active += 1
+                    stub.peak = max(stub.peak, stub.active)
+                try:
+                    time.sleep(stub.delay)
+                    payload = json.dumps({"choices": [{"text": stub.answers.get(body["prompt"], "bullish")}]})
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload.encode("utf-8"))
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client gave up at its deadline
+                finally:
+                    with stub.lock:
+                        stub.active -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.endpoint = f"http://127.0.0.1:{self.server.server_address[1]}/v1/completions"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def make_stage():
+    """ Build stages against stub servers and stop everything at the end of the test. """
+    created = []
+
+    def make(delay=0.0, answers=None, **kwargs):
+        server = StubServer(delay, answers)
+        stage = LLMSignalStage(server.endpoint, **kwargs)
+        created.append((server, stage))
+        return server, stage
+
+    yield make
+    for server, stage in created:
+        stage.Stop()
+        server.close()
+
+
+BAR = datetime(2023, 1, 3)
+
+
+@pytest.mark.parametrize("text, signal", [
+    ("Bullish.", 1.0),
+    ("  BEARISH\n", -1.0),
+    ("neutral", 0.0),
+    ("Not bullish", 0.0),
+    ("it is not bearish", 0.0),
+    ("1. bearish", -1.0),
+    ("0.4", 0.4),
+    ("-3", -1.0),
+    ("I don't know", 0.0),
+])
+def test_parse_signal(text, signal):
+    assert ParseSignal(text) == pytest.approx(signal)
+
+
+def test_duplicate_prompts_are_sent_once(make_stage):
+    server, stage = make_stage(delay=0.1)
+    signals = stage.Run({"SPY": "same prompt", "IVV": "same prompt", "VOO": "same prompt"}, BAR, timeout=5)
+
+    assert signals == {"SPY": 1.0, "IVV": 1.0, "VOO": 1.0}
+    assert len(server.calls) == 1
+
+
+def test_concurrency_is_bounded(make_stage):
+    server, stage = make_stage(delay=0.2, max_concurrency=2)
+    stage.Run({f"S{i}": f"prompt {i}" for i in range(6)}, BAR, timeout=10)
+
+    assert len(server.calls) == 6
+    assert server.peak == 2
+
+
+def test_queued_prompts_do_not_time_out(make_stage):
+    # 10 prompts, 2 at a time, 0.4 s each: the last ones wait ~1.6 s in the queue,
+    # longer than the deadline of a request, and must still be sent and answered
+    server, stage = make_stage(delay=0.4, max_concurrency=2, timeout=1.0)
+    signals = stage.Run({f"S{i}": f"prompt {i}" for i in range(10)}, BAR, timeout=10)
+
+    assert len(server.calls) == 10
+    assert all(signal == 1.0 for signal in signals.values())
+
+
+def test_timeout_keeps_last_good_signal(make_stage):
+    server, stage = make_stage(answers={"slow": "bearish"}, timeout=0.3)
+    stage.Run({"SPY": "fast"}, BAR, timeout=5)
+
+    # the next bar times out: no signal is stored, the previous one is still returned
+    server.delay = 1.0
+    signals = stage.Run({"SPY": "slow"}, BAR + timedelta(1), timeout=5)
+
+    assert signals == {"SPY": None}
+    assert stage.GetSignal("SPY", BAR + timedelta(1)) == (1.0, BAR)
+    assert stage.GetSignal("SPY", BAR + timedelta(1), max_age=timedelta(0), default=-0.5) == (-0.5, None)
+    assert stage.GetSignal("QQQ", BAR + timedelta(1)) == (0.0, None)
+
+
+def test_failed_request_is_not_cached(make_stage):
+    server, stage = make_stage(timeout=0.3)
+    server.delay = 1.0
+    assert stage.Run({"SPY": "prompt"}, BAR, timeout=5) == {"SPY": None}
+
+    server.delay = 0.0
+    assert stage.Run({"SPY": "prompt"}, BAR + timedelta(1), timeout=5) == {"SPY": 1.0}
+    assert len(server.calls) == 2
+
+
+def test_signals_are_tagged_with_bar_time(make_stage):
+    server, stage = make_stage(answers={"day 2": "bearish"})
+    stage.Run({"SPY": "day 1"}, BAR, timeout=5)
+    stage.Run({"SPY": "day 2"}, BAR + timedelta(1), timeout=5)
+
+    assert stage.GetSignal("SPY", BAR) == (1.0, BAR)
+    assert stage.GetSignal("SPY", BAR + timedelta(1)) == (-1.0, BAR + timedelta(1))
+    assert stage.GetSignal("SPY", BAR - timedelta(1)) == (0.0, None)
+
+
+def test_cache_hit_after_reload(make_stage, tmp_path):
+    cache_path = str(tmp_path / "llm_cache.json")
+    server, stage = make_stage(answers={"prompt": "bearish"}, cache_path=cache_path)
+    stage.Run({"SPY": "prompt"}, BAR, timeout=5)
+    stage.Stop()  # flushes the cache file
+    assert len(server.calls) == 1
+
+    server, reloaded = make_stage(cache_path=cache_path)
+    assert reloaded.Run({"SPY": "prompt"}, BAR, timeout=5) == {"SPY": -1.0}
+    assert server.calls == []
@@ -0,0 +1,127 @@
+"""
+Tests of the Risk Allocator.
+"""
+
+# general imports
+import numpy as np
+import pandas as pd
+import pytest
+
+# library imports
+from risk_allocator import EWMACovariance, RiskAllocator
+# endregion
+
+
+def RandomPrices(T, N, seed=0):
+    """ (T, N) correlated random walk prices. """
+    rng = np.random.default_rng(seed)
+    mixing = rng.normal(0, 0.01, (N, N)) / np.sqrt(N)
+    returns = rng.normal(0, 1, (T, N)) @ mixing + rng.normal(0, 0.005, (T, N))
+    return 100 * np.cumprod(1 + returns, axis=0)
+
+
+def BatchEWMA(prices, halflife):
+    """
+    Pairwise batch EWMA covariance: every pair uses the returns of the bars where both symbols
+    have a return (no gap on this bar nor on the previous one), every mean the bars of its symbol.
+    """
+    lam = 0.5 ** (1.0 / halflife)
+    returns = prices[1:] / prices[:-1] - 1  # NaN around the gaps
+    T, N = returns.shape
+    mean = np.zeros(N)
+    cov = np.zeros((N, N))
+    for t in range(T):
+        valid = np.isfinite(returns[t])
+        deviation = returns[t] - mean
+        for i in range(N):
+            for j in range(N):
+                if valid[i] and valid[j]:
+                    cov[i, j] = lam * cov[i, j] + (1 - lam) * deviation[i] * deviation[j]
+        mean[valid] = lam * mean[valid] + (1 - lam) * returns[t, valid]
+    return cov
+
+
+def test_covariance_matches_pandas():
+    prices = RandomPrices(2000, 5)
+    estimator = EWMACovariance(5, halflife=30)
+    for bar in prices:
+        estimator.Update(bar)
+
+    returns = pd.DataFrame(prices).pct_change().iloc[1:]
+    expected = returns.ewm(halflife=30, adjust=False).cov(bias=True).loc[len(prices) - 1].to_numpy()
+    assert estimator.cov == pytest.approx(expected, rel=0.05, abs=1e-7)
+
+
+def test_covariance_with_gaps():
+    prices = RandomPrices(500, 4, seed=1)
+    prices[100:110, 1] = np.nan  # suspended for 10 bars
+    prices[300, 3] = np.nan      # one missing bar
+    prices[:50, 2] = np.nan      # listed later
+
+    estimator = EWMACovariance(4, halflife=30)
+    for bar in prices:
+        estimator.Update(bar)
+
+    assert np.isfinite(estimator.cov).all()
+    assert estimator.cov == pytest.approx(BatchEWMA(prices, 30), rel=1e-9, abs=1e-15)
+
+
+def test_gaps_do_not_shrink_the_variance():
+    prices = RandomPrices(1000, 2, seed=2)
+    gappy = prices.copy()
+    gappy[::3, 1] = np.nan  # a third of the bars missing
+
+    full, partial = EWMACovariance(2), EWMACovariance(2)
+    for bar, gappy_bar in zip(prices, gappy):
+        full.Update(bar)
+        partial.Update(gappy_bar)
+
+    # fewer observations of the same process, but no 0% returns pulling the estimate down
+    assert partial.cov[1, 1] == pytest.approx(full.cov[1, 1], rel=0.5)
+    assert partial.cov[0, 0] == pytest.approx(full.cov[0, 0])
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("max_weight, max_gross, max_net, binding", [
+    (0.08, 10.0, 10.0, "weight"),
+    (0.08, 1.0, 10.0, "gross"),
+    (0.08, 1.0, 0.2, "net"),
+])
+def test_weights_respect_caps(seed, max_weight, max_gross, max_net, binding):
+    rng = np.random.default_rng(seed)
+    symbols = [f"S{i}" for i in range(40)]
+    allocator = RiskAllocator(symbols, target_vol=0.5, max_weight=max_weight, max_gross=max_gross, max_net=max_net)
+    for bar in RandomPrices(100, 40, seed=seed):
+        allocator.Update(bar)
+
+    # mostly long signals so that the net cap can bind
+    signals = {symbol: rng.choice([1, 1, 1, -1]) * rng.uniform(0.5, 2) for symbol in symbols}
+    weights = allocator.ComputeWeights(signals)
+
+    assert np.abs(weights).max() <= max_weight + 1e-12
+    assert np.abs(weights).sum() <= max_gross + 1e-12
+    assert abs(weights.sum()) <= max_net + 1e-12
+    assert (np.sign(weights) == np.sign([signals[symbol] for symbol in symbols])).all()
+
+    # the cap under test is the one that binds
+    value = {"weight": np.abs(weights).max(), "gross": np.abs(weights).sum(), "net": abs(weights.sum())}[binding]
+    assert value == pytest.approx({"weight": max_weight, "gross": max_gross, "net": max_net}[binding])
+
+
+def test_weights_hit_the_volatility_target():
+    symbols = [f"S{i}" for i in range(10)]
+    allocator = RiskAllocator(symbols, target_vol=0.05, max_weight=1.0, max_gross=10.0, max_net=10.0)
+    for bar in RandomPrices(200, 10, seed=3):
+        allocator.Update(bar)
+
+    weights = allocator.ComputeWeights({symbol: 1 for symbol in symbols})
+    cov = allocator.covariance.cov
+    assert np.sqrt(weights @ cov @ weights * 252) == pytest.approx(0.05)
+
+
+def test_no_weights_before_warmup():
+    allocator = RiskAllocator(["A", "B"], warmup=20)
+    for bar in RandomPrices(10, 2):
+        allocator.Update(bar)
+    assert not allocator.IsReady
+    assert allocator.ComputeWeights({"A": 1, "B": -1}).tolist() == [0, 0]